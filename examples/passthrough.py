@@ -9,12 +9,16 @@
 #  then back through through the FLAC decoder. It also asserts that the
 #  uncompressed output is exactly equal to the original signal.
 #
+#  The encoder runs in its own thread, and the encoded data is handed to
+#  the decoder as it is produced through a bounded queue.
+#
 #  Copyright (c) 2020-2021, Sonos, Inc.
 #  All rights reserved.
 #
 # ------------------------------------------------------------------------------
 
 import argparse
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import queue
 
@@ -22,13 +26,16 @@ import numpy as np
 import soundfile as sf
 import pyflac
 
+# The number of samples passed to the encoder at a time
+CHUNK_SIZE = 16384
+
 
 class Passthrough:
 
     def __init__(self, args):
         self.idx = 0
         self.total_bytes = 0
-        self.queue = queue.SimpleQueue()
+        self.queue = queue.Queue(maxsize=16)
 
         info = sf.info(str(args.input_file))
         if info.subtype == 'PCM_16':
@@ -40,6 +47,15 @@ class Passthrough:
 
         self.data, self.sr = sf.read(args.input_file, dtype=dtype, always_2d=True)
 
+        # --------------------------------------------------------------
+        # Keep the chunks a multiple of the block size, so that the
+        # encoder does not have to hold back a partial block each time.
+        # --------------------------------------------------------------
+        if args.block_size:
+            self.chunk_size = max(CHUNK_SIZE // args.block_size, 1) * args.block_size
+        else:
+            self.chunk_size = CHUNK_SIZE
+
         self.encoder = pyflac.StreamEncoder(
             write_callback=self.encoder_callback,
             sample_rate=self.sr,
@@ -50,13 +66,32 @@ class Passthrough:
             write_callback=self.decoder_callback
         )
 
+    def process(self):
+        # --------------------------------------------------------------
+        # Run the encoder in a separate thread, the future re-raises any
+        # exception from the encoder here, once the decoder is done.
+        # --------------------------------------------------------------
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            encoding = executor.submit(self.encode)
+            self.decode()
+            encoding.result()
+
+        assert self.idx == len(self.data), f'Decoded {self.idx} of {len(self.data)} samples'
+
     def encode(self):
-        self.encoder.process(self.data)
-        self.encoder.finish()
+        try:
+            for i in range(0, len(self.data), self.chunk_size):
+                self.encoder.process(self.data[i:i + self.chunk_size])
+            self.encoder.finish()
+        finally:
+            self.queue.put(None)
 
     def decode(self):
-        while not self.queue.empty():
-            self.decoder.process(self.queue.get())
+        while True:
+            buffer = self.queue.get()
+            if buffer is None:
+                break
+            self.decoder.process(buffer)
         self.decoder.finish()
 
     def encoder_callback(self,
@@ -89,8 +124,7 @@ def main():
     args = parser.parse_args()
 
     flac = Passthrough(args)
-    flac.encode()
-    flac.decode()
+    flac.process()
 
     print('Verified OK')
     print('Compression ratio = {ratio:.2f}%'.format(
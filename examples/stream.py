@@ -16,6 +16,7 @@
 # ------------------------------------------------------------------------------
 
 import argparse
+from collections import deque
 from pathlib import Path
 import queue
 import threading
@@ -25,54 +26,104 @@ import numpy as np
 import pyflac
 import sounddevice as sd
 
+# The maximum number of audio blocks to combine into a single call to the encoder
+MAX_BLOCKS = 8
+
+# The number of preallocated audio buffers, and their size if the block size is variable
+POOL_SIZE = 32
+POOL_FRAMES = 4096
+
+# The interval (in seconds) between printing the compression statistics
+REPORT_INTERVAL = 1.0
+
+# The buffer size (in bytes) for writing the output file
+OUTPUT_BUFFER_SIZE = 1 << 20
+
 
 class ProcessingThread(threading.Thread):
 
     def __init__(self, args, stream):
         super().__init__()
         self.output_file = None
-        self.queue = queue.SimpleQueue()
+        self.queue = queue.Queue()
+        self.current_frame = 0
+        self.num_bytes = 0
+        self.num_samples = 0
         self.num_channels = stream.channels
         self.sample_size = stream.samplesize
+        self.pool = deque(
+            np.empty((args.block_size or POOL_FRAMES, self.num_channels), dtype=np.int16)
+            for _ in range(POOL_SIZE)
+        )
 
         self.encoder = pyflac.StreamEncoder(write_callback=self.encoder_callback,
                                             sample_rate=int(stream.samplerate),
                                             compression_level=args.compression_level)
 
         if args.output_file:
-            self.output_file = open(args.output_file, 'wb')
-
-    def start(self):
-        self.running = True
-        super().start()
+            self.output_file = open(args.output_file, 'wb', buffering=OUTPUT_BUFFER_SIZE)
 
     def stop(self):
-        self.running = False
+        self.queue.put(None)
 
     def encoder_callback(self, buffer, num_bytes, num_samples, current_frame):
         if num_samples == 0:
             print('FLAC header')
         else:
-            print('{i}: Encoded {actual_bytes} bytes in {num_bytes} bytes: {ratio:.2f}%'.format(
-                i=current_frame,
-                actual_bytes=num_samples * self.num_channels * self.sample_size,
-                num_bytes=num_bytes,
-                ratio=num_bytes / (num_samples * self.num_channels * self.sample_size) * 100
-            ))
+            self.current_frame = current_frame
+            self.num_bytes += num_bytes
+            self.num_samples += num_samples
 
         if self.output_file:
             self.output_file.write(buffer)
-            self.output_file.flush()
+
+    def report(self):
+        if self.num_samples:
+            actual_bytes = self.num_samples * self.num_channels * self.sample_size
+            print('{i}: Encoded {actual_bytes} bytes in {num_bytes} bytes: {ratio:.2f}%'.format(
+                i=self.current_frame,
+                actual_bytes=actual_bytes,
+                num_bytes=self.num_bytes,
+                ratio=self.num_bytes / actual_bytes * 100
+            ))
+        self.num_bytes = 0
+        self.num_samples = 0
 
     def run(self):
-        while self.running:
-            while not self.queue.empty():
-                data = np.frombuffer(self.queue.get(), dtype=np.int16)
-                samples = data.reshape((len(data) // self.num_channels, self.num_channels))
+        next_report = time.monotonic() + REPORT_INTERVAL
+        done = False
+        while not done:
+            if time.monotonic() >= next_report:
+                self.report()
+                next_report += REPORT_INTERVAL
+
+            try:
+                blocks = [self.queue.get(timeout=0.1)]
+            except queue.Empty:
+                continue
+
+            # ----------------------------------------------------------
+            # Combine whatever else is pending so that the encoder is
+            # called once for several audio blocks, stopping at the
+            # `None` sentinel queued by `stop`.
+            # ----------------------------------------------------------
+            while blocks[-1] is not None and len(blocks) < MAX_BLOCKS:
+                try:
+                    blocks.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            done = blocks[-1] is None
+            if done:
+                blocks.pop()
+
+            if blocks:
+                samples = np.concatenate([buffer[:frames] for buffer, frames in blocks])
+                self.pool.extend(buffer for buffer, _ in blocks)
                 self.encoder.process(samples)
-            time.sleep(0.1)
 
         self.encoder.finish()
+        self.report()
         if self.output_file:
             print(f'Wrote output to {self.output_file.name}')
             self.output_file.close()
@@ -81,7 +132,7 @@ class ProcessingThread(threading.Thread):
 class AudioStream:
 
     def __init__(self, args):
-        self.stream = sd.RawInputStream(
+        self.stream = sd.InputStream(
             dtype='int16',
             blocksize=args.block_size,
             callback=self.audio_callback
@@ -97,7 +148,18 @@ class AudioStream:
         self.thread.stop()
 
     def audio_callback(self, indata, frames, sd_time, status):
-        self.thread.queue.put(bytes(indata))
+        # --------------------------------------------------------------
+        # Copy into a preallocated buffer, only allocating if the pool
+        # has run dry or the block is larger than expected.
+        # --------------------------------------------------------------
+        try:
+            buffer = self.thread.pool.popleft()
+        except IndexError:
+            buffer = None
+        if buffer is None or len(buffer) < frames:
+            buffer = np.empty_like(indata)
+        buffer[:frames] = indata
+        self.thread.queue.put((buffer, frames))
 
 
 def main():
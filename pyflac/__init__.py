@@ -25,39 +25,61 @@ __all__ = [
     'DecoderProcessException'
 ]
 
+import importlib
 import os
-import platform
-
-from cffi import FFI
+import sys
 
 # ------------------------------------------------------------------------------
 # Fix DLL load for Windows
 #
-# Since there is no rpath equivalent for Windows, we just explicitly load
-# the libFLAC DLL here.
+# Since there is no rpath equivalent for Windows, we add the directory of
+# the bundled libFLAC DLL to the DLL search path here, so that the loader
+# can resolve it when the extension modules are imported.
+# ------------------------------------------------------------------------------
+if sys.platform == 'win32':
+    _libraries_path = os.path.join(
+        os.path.dirname(os.path.abspath(__file__)),
+        'libraries',
+        'windows-x86_64' if sys.maxsize > 2**32 else 'windows-i686'
+    )
+    _dll_directory = os.add_dll_directory(_libraries_path)
+
+
+# ------------------------------------------------------------------------------
+# Lazy imports
+#
+# The encoder and decoder modules load numpy, SoundFile and libFLAC, so they
+# are only imported the first time one of their names is used. This keeps
+# the start up of the command line tool fast, e.g. for `--help`.
 # ------------------------------------------------------------------------------
-if platform.system() == 'Windows':
-    ffi = FFI()
-    base_path = os.path.dirname(os.path.abspath(__file__))
-    if platform.architecture()[0] == '32bit':
-        libflac = ffi.dlopen(os.path.join(base_path, 'libraries', 'windows-i686', 'libFLAC.dll'))
-    elif platform.architecture()[0] == '64bit':
-        libflac = ffi.dlopen(os.path.join(base_path, 'libraries', 'windows-x86_64', 'libFLAC.dll'))
-
-
-# flake8: noqa: F401
-from .encoder import (
-    StreamEncoder,
-    FileEncoder,
-    EncoderState,
-    EncoderInitException,
-    EncoderProcessException
-)
-from .decoder import (
-    StreamDecoder,
-    FileDecoder,
-    OneShotDecoder,
-    DecoderState,
-    DecoderInitException,
-    DecoderProcessException
-)
+_MODULES = {
+    'StreamEncoder': 'encoder',
+    'FileEncoder': 'encoder',
+    'EncoderState': 'encoder',
+    'EncoderInitException': 'encoder',
+    'EncoderProcessException': 'encoder',
+    'StreamDecoder': 'decoder',
+    'FileDecoder': 'decoder',
+    'OneShotDecoder': 'decoder',
+    'DecoderState': 'decoder',
+    'DecoderInitException': 'decoder',
+    'DecoderProcessException': 'decoder',
+}
+
+# The submodules that are also loaded on first access, e.g. `pyflac.decoder`
+_SUBMODULES = ('encoder', 'decoder')
+
+
+def __getattr__(name):
+    if name in _SUBMODULES:
+        return importlib.import_module(f'.{name}', __name__)
+    if name not in _MODULES:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    module = importlib.import_module(f'.{_MODULES[name]}', __name__)
+    value = getattr(module, name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
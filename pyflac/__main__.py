@@ -11,50 +11,78 @@
 # ------------------------------------------------------------------------------
 
 import argparse
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import os
 
-from pyflac import FileEncoder, FileDecoder
-
 
 def get_args():
     parser = argparse.ArgumentParser(
         description='pyFLAC encoder/decoder',
         epilog='Convert WAV files to FLAC and vice versa'
     )
-    parser.add_argument('input_file', type=Path, help='Input file to encode/decode')
-    parser.add_argument('-o', '--output-file', type=Path, help='Output file')
+    parser.add_argument('input_files', type=Path, nargs='+', metavar='input_file',
+                        help='Input file(s) to encode/decode')
+    parser.add_argument('-o', '--output-file', type=Path, help='Output file, only valid for a single input file')
     parser.add_argument('-c', '--compression-level', type=int, choices=range(0, 9), default=5,
                         help='0 is the fastest compression, 5 is the default, 8 is the highest compression')
     parser.add_argument('-b', '--block-size', type=int, default=0, help='The block size')
-    parser.add_argument('-v', '--verify', action='store_false', default=True, help='Verify the compressed data')
+    parser.add_argument('-v', '--verify', action='store_true',
+                        help='Verify the compressed data, this roughly doubles the encoding time')
+    parser.add_argument('--md5', action='store_true',
+                        help='Check the decoded audio against the MD5 signature in the FLAC file')
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1,
+                        help='The number of files to convert in parallel')
     args = parser.parse_args()
+    if args.output_file and len(args.input_files) > 1:
+        parser.error('--output-file can only be used with a single input file')
     return args
 
 
-def main():
-    args = get_args()
-    with open(args.input_file, 'rb') as f:
+def convert(input_file, args):
+    # ------------------------------------------------------------------
+    # Imported here, so that parsing the arguments does not have to wait
+    # for numpy, SoundFile and libFLAC to load.
+    # ------------------------------------------------------------------
+    from pyflac import FileEncoder, FileDecoder
+
+    with open(input_file, 'rb') as f:
         header = f.read(4).decode().upper()
 
-    filename, extension = os.path.splitext(args.input_file)
+    filename, extension = os.path.splitext(input_file)
     if header == 'RIFF':
-        args.output_file = f'{filename}.flac' if args.output_file is None else args.output_file
+        output_file = f'{filename}.flac' if args.output_file is None else args.output_file
         encoder = FileEncoder(
-            input_file=args.input_file,
-            output_file=args.output_file,
+            input_file=input_file,
+            output_file=output_file,
             blocksize=args.block_size,
             compression_level=args.compression_level,
             verify=args.verify
         )
         encoder.process()
     elif header == 'FLAC':
-        args.output_file = f'{filename}.wav' if args.output_file is None else args.output_file
-        decoder = FileDecoder(args.input_file, args.output_file)
+        output_file = f'{filename}.wav' if args.output_file is None else args.output_file
+        decoder = FileDecoder(input_file, output_file, md5_checking=args.md5)
         decoder.process()
     else:
         raise ValueError('Please provide either a WAV or a FLAC file')
 
 
+def main():
+    args = get_args()
+
+    # ------------------------------------------------------------------
+    # libFLAC is called with the GIL released, so several files can be
+    # converted concurrently from a pool of threads.
+    # ------------------------------------------------------------------
+    if len(args.input_files) == 1 or args.jobs <= 1:
+        for input_file in args.input_files:
+            convert(input_file, args)
+    else:
+        with ThreadPoolExecutor(max_workers=args.jobs) as executor:
+            for future in [executor.submit(convert, f, args) for f in args.input_files]:
+                future.result()
+
+
 if __name__ == '__main__':
     main()
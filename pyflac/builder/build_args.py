@@ -9,56 +9,124 @@
 #
 # ------------------------------------------------------------------------------
 
+import ctypes
+import functools
 import os
 import platform
 import subprocess
 
+# From <sys/auxv.h> and <asm/hwcap.h> on 32-bit ARM Linux
+AT_HWCAP = 16
+HWCAP_NEON = 1 << 12
 
-def get_build_kwargs():
-    system = platform.system()
-    builder_path = os.path.dirname(os.path.realpath(__file__))
-    package_path = os.path.abspath(os.path.join(builder_path, os.pardir))
+# Profile guided optimisation phase, either "generate" or "use"
+PGO_PHASE = os.environ.get('PYFLAC_PGO')
+PGO_DIR = os.path.abspath(os.environ.get('PYFLAC_PGO_DIR', 'pgo'))
 
-    build_kwargs = {
-        'include_dirs': ['./pyflac/include'],
-    }
+SYSTEM = platform.system()
+MACHINE = platform.machine()
+PACKAGE_PATH = os.path.abspath(os.path.join(os.path.dirname(os.path.realpath(__file__)), os.pardir))
 
-    if system == 'Darwin':
+
+@functools.lru_cache(maxsize=None)
+def has_neon():
+    """
+    Check whether a 32-bit ARM Linux CPU supports NEON, using the
+    hardware capabilities the kernel passes to every process.
+    Falls back to reading /proc/cpuinfo if getauxval is unavailable.
+    """
+    try:
+        getauxval = ctypes.CDLL(None).getauxval
+        getauxval.argtypes = [ctypes.c_ulong]
+        getauxval.restype = ctypes.c_ulong
+        return bool(getauxval(AT_HWCAP) & HWCAP_NEON)
+    except (OSError, AttributeError):
+        with open('/proc/cpuinfo') as f:
+            return 'neon' in f.read()
+
+
+@functools.lru_cache(maxsize=None)
+def get_architecture():
+    """
+    Get the name of the directory containing the bundled libFLAC
+    for the current platform.
+    """
+    if SYSTEM == 'Darwin':
         cpuinfo = subprocess.check_output(['sysctl', '-n', 'machdep.cpu.brand_string']).decode()
         if cpuinfo.startswith('Apple'):
-            architecture = 'darwin-arm64'
-        else:
-            architecture = 'darwin-x86_64'
+            return 'darwin-arm64'
+        return 'darwin-x86_64'
 
-        build_kwargs['libraries'] = ['FLAC.12']
-        build_kwargs['library_dirs'] = [os.path.join(package_path, 'libraries', architecture)]
-        build_kwargs['extra_link_args'] = ['-Wl,-rpath,@loader_path/libraries/' + architecture]
+    if SYSTEM == 'Linux':
+        if MACHINE.startswith('arm'):
+            if has_neon():
+                return 'raspbian-armv7a'
+            return 'raspbian-armv6z'
+        if MACHINE == 'aarch64':
+            return 'linux-arm64'
+        return 'linux-x86_64'
+
+    if SYSTEM == 'Windows':
+        if platform.architecture()[0] == '32bit':
+            return 'windows-i686'
+        return 'windows-x86_64'
+
+    raise RuntimeError('%s platform is not supported' % SYSTEM)
 
-    elif system == 'Linux':
-        if os.uname()[4][:3] == 'arm':
-            cpuinfo = subprocess.check_output(['cat', '/proc/cpuinfo']).decode()
-            if 'neon' in cpuinfo:
-                architecture = 'raspbian-armv7a'
-            else:
-                architecture = 'raspbian-armv6z'
-        elif platform.machine() == 'aarch64':
-            architecture = 'linux-arm64'
-        else:
-            architecture = 'linux-x86_64'
 
+def get_build_kwargs():
+    architecture = get_architecture()
+    build_kwargs = {
+        'include_dirs': ['./pyflac/include'],
+        'library_dirs': [os.path.join(PACKAGE_PATH, 'libraries', architecture)],
+    }
+
+    if SYSTEM == 'Darwin':
+        build_kwargs['libraries'] = ['FLAC.12']
+        build_kwargs['extra_link_args'] = ['-Wl,-rpath,@loader_path/libraries/' + architecture]
+    elif SYSTEM == 'Linux':
         build_kwargs['libraries'] = ['FLAC-12.1.0']
-        build_kwargs['library_dirs'] = [os.path.join(package_path, 'libraries', architecture)]
         build_kwargs['extra_link_args'] = ['-Wl,-rpath,$ORIGIN/libraries/' + architecture]
+    else:
+        build_kwargs['libraries'] = ['FLAC-12']
 
-    elif system == 'Windows':
-        if platform.architecture()[0] == '32bit':
-            architecture = 'windows-i686'
-        else:
-            architecture = 'windows-x86_64'
+    compile_args, link_args = get_optimisation_args(SYSTEM)
+    build_kwargs['extra_compile_args'] = compile_args
+    build_kwargs['extra_link_args'] = build_kwargs.get('extra_link_args', []) + link_args
 
-        build_kwargs['libraries'] = ['FLAC-12']
-        build_kwargs['library_dirs'] = [os.path.join(package_path, 'libraries', architecture)]
+    return build_kwargs
+
+
+def get_optimisation_args(system):
+    """
+    Get the compiler flags used to optimise the CFFI glue code, which
+    dispatches every libFLAC call and marshals every callback.
+    Unused code is discarded at link time, and no -march flags are used
+    so that the built wheels run on any CPU of the target architecture.
+
+    Set PYFLAC_PGO=generate to build an instrumented extension, run a
+    representative workload, then rebuild with PYFLAC_PGO=use.
+    The profile data is stored in PYFLAC_PGO_DIR (default: ./pgo).
+    PGO is only supported with GCC/Clang.
+    """
+    if system == 'Windows':
+        return ['/O2', '/GL'], ['/LTCG']
+
+    compile_args = ['-O3', '-flto', '-ffunction-sections', '-fdata-sections']
+    link_args = ['-flto']
+    if system == 'Linux':
+        compile_args.append('-fno-plt')
+        link_args.append('-Wl,--gc-sections')
     else:
-        raise RuntimeError('%s platform is not supported' % system)
+        link_args.append('-Wl,-dead_strip')
 
-    return build_kwargs
+    if PGO_PHASE == 'generate':
+        pgo_args = ['-fprofile-generate=' + PGO_DIR]
+    elif PGO_PHASE == 'use':
+        pgo_args = ['-fprofile-use=' + PGO_DIR, '-fprofile-correction']
+    elif PGO_PHASE:
+        raise RuntimeError('PYFLAC_PGO must be either "generate" or "use", not "%s"' % PGO_PHASE)
+    else:
+        pgo_args = []
+
+    return compile_args + pgo_args, link_args + pgo_args
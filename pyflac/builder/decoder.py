@@ -24,6 +24,33 @@ ffibuilder.set_source(
     """
     #include <FLAC/format.h>
     #include <FLAC/stream_decoder.h>
+
+    static void pyflac_interleave_int8(const FLAC__int32 * const buffer[], uint32_t channels,
+                                       uint32_t blocksize, int8_t *output)
+    {
+        uint32_t i, ch;
+        for (i = 0; i < blocksize; i++)
+            for (ch = 0; ch < channels; ch++)
+                *output++ = (int8_t)buffer[ch][i];
+    }
+
+    static void pyflac_interleave_int16(const FLAC__int32 * const buffer[], uint32_t channels,
+                                        uint32_t blocksize, int16_t *output)
+    {
+        uint32_t i, ch;
+        for (i = 0; i < blocksize; i++)
+            for (ch = 0; ch < channels; ch++)
+                *output++ = (int16_t)buffer[ch][i];
+    }
+
+    static void pyflac_interleave_int32(const FLAC__int32 * const buffer[], uint32_t channels,
+                                        uint32_t blocksize, int32_t *output)
+    {
+        uint32_t i, ch;
+        for (i = 0; i < blocksize; i++)
+            for (ch = 0; ch < channels; ch++)
+                *output++ = buffer[ch][i];
+    }
     """,
     **get_build_kwargs()
 )
@@ -231,6 +258,9 @@ typedef struct {
 } FLAC__Frame;
 
 // METADATA
+// The blocks only referenced through pointers, and the picture types, are left
+// opaque as pyFLAC never reads them. The blocks held in the FLAC__StreamMetadata
+// union must still be declared in full, so that CFFI knows the size of the union.
 typedef enum {
     FLAC__METADATA_TYPE_STREAMINFO = 0,
     FLAC__METADATA_TYPE_PADDING = 1,
@@ -262,11 +292,7 @@ typedef struct {
     FLAC__byte *data;
 } FLAC__StreamMetadata_Application;
 
-typedef struct {
-    FLAC__uint64 sample_number;
-    FLAC__uint64 stream_offset;
-    uint32_t frame_samples;
-} FLAC__StreamMetadata_SeekPoint;
+typedef struct { ...; } FLAC__StreamMetadata_SeekPoint;
 
 typedef struct {
     uint32_t num_points;
@@ -284,20 +310,7 @@ typedef struct {
     FLAC__StreamMetadata_VorbisComment_Entry *comments;
 } FLAC__StreamMetadata_VorbisComment;
 
-typedef struct {
-    FLAC__uint64 offset;
-    FLAC__byte number;
-} FLAC__StreamMetadata_CueSheet_Index;
-
-typedef struct {
-    FLAC__uint64 offset;
-    FLAC__byte number;
-    char isrc[13];
-    uint32_t type:1;
-    uint32_t pre_emphasis:1;
-    FLAC__byte num_indices;
-    FLAC__StreamMetadata_CueSheet_Index *indices;
-} FLAC__StreamMetadata_CueSheet_Track;
+typedef struct { ...; } FLAC__StreamMetadata_CueSheet_Track;
 
 typedef struct {
     char media_catalog_number[129];
@@ -307,30 +320,7 @@ typedef struct {
     FLAC__StreamMetadata_CueSheet_Track *tracks;
 } FLAC__StreamMetadata_CueSheet;
 
-typedef enum {
-    FLAC__STREAM_METADATA_PICTURE_TYPE_OTHER = 0, /**< Other */
-    FLAC__STREAM_METADATA_PICTURE_TYPE_FILE_ICON_STANDARD = 1, /**< 32x32 pixels 'file icon' (PNG only) */
-    FLAC__STREAM_METADATA_PICTURE_TYPE_FILE_ICON = 2, /**< Other file icon */
-    FLAC__STREAM_METADATA_PICTURE_TYPE_FRONT_COVER = 3, /**< Cover (front) */
-    FLAC__STREAM_METADATA_PICTURE_TYPE_BACK_COVER = 4, /**< Cover (back) */
-    FLAC__STREAM_METADATA_PICTURE_TYPE_LEAFLET_PAGE = 5, /**< Leaflet page */
-    FLAC__STREAM_METADATA_PICTURE_TYPE_MEDIA = 6, /**< Media (e.g. label side of CD) */
-    FLAC__STREAM_METADATA_PICTURE_TYPE_LEAD_ARTIST = 7, /**< Lead artist/lead performer/soloist */
-    FLAC__STREAM_METADATA_PICTURE_TYPE_ARTIST = 8, /**< Artist/performer */
-    FLAC__STREAM_METADATA_PICTURE_TYPE_CONDUCTOR = 9, /**< Conductor */
-    FLAC__STREAM_METADATA_PICTURE_TYPE_BAND = 10, /**< Band/Orchestra */
-    FLAC__STREAM_METADATA_PICTURE_TYPE_COMPOSER = 11, /**< Composer */
-    FLAC__STREAM_METADATA_PICTURE_TYPE_LYRICIST = 12, /**< Lyricist/text writer */
-    FLAC__STREAM_METADATA_PICTURE_TYPE_RECORDING_LOCATION = 13, /**< Recording Location */
-    FLAC__STREAM_METADATA_PICTURE_TYPE_DURING_RECORDING = 14, /**< During recording */
-    FLAC__STREAM_METADATA_PICTURE_TYPE_DURING_PERFORMANCE = 15, /**< During performance */
-    FLAC__STREAM_METADATA_PICTURE_TYPE_VIDEO_SCREEN_CAPTURE = 16, /**< Movie/video screen capture */
-    FLAC__STREAM_METADATA_PICTURE_TYPE_FISH = 17, /**< A bright coloured fish */
-    FLAC__STREAM_METADATA_PICTURE_TYPE_ILLUSTRATION = 18, /**< Illustration */
-    FLAC__STREAM_METADATA_PICTURE_TYPE_BAND_LOGOTYPE = 19, /**< Band/artist logotype */
-    FLAC__STREAM_METADATA_PICTURE_TYPE_PUBLISHER_LOGOTYPE = 20, /**< Publisher/Studio logotype */
-    FLAC__STREAM_METADATA_PICTURE_TYPE_UNDEFINED
-} FLAC__StreamMetadata_Picture_Type;
+typedef int... FLAC__StreamMetadata_Picture_Type;
 
 typedef struct {
     FLAC__StreamMetadata_Picture_Type type;
@@ -374,15 +364,21 @@ typedef FLAC__StreamDecoderWriteStatus (*FLAC__StreamDecoderWriteCallback)(const
 typedef void (*FLAC__StreamDecoderMetadataCallback)(const FLAC__StreamDecoder *decoder, const FLAC__StreamMetadata *metadata, void *client_data);
 typedef void (*FLAC__StreamDecoderErrorCallback)(const FLAC__StreamDecoder *decoder, FLAC__StreamDecoderErrorStatus status, void *client_data);
 
+// Each callback must be defined with @ffi.def_extern(error=...) returning the
+// abort or error status, so that an exception raised in Python stops libFLAC.
+// Only the callbacks that are passed to libFLAC are declared, the seek, tell,
+// length and eof callbacks are always NULL, as the stream decoders never seek,
+// and libFLAC provides its own when initialised with a file.
 extern "Python" FLAC__StreamDecoderReadStatus _read_callback(const FLAC__StreamDecoder *, FLAC__byte *, size_t *, void *);
-extern "Python" FLAC__StreamDecoderSeekStatus _seek_callback(const FLAC__StreamDecoder *, FLAC__uint64, void *);
-extern "Python" FLAC__StreamDecoderTellStatus _tell_callback(const FLAC__StreamDecoder *, FLAC__uint64 *, void *);
-extern "Python" FLAC__StreamDecoderLengthStatus _length_callback(const FLAC__StreamDecoder *, FLAC__uint64 *, void *);
-extern "Python" FLAC__bool _eof_callback(const FLAC__StreamDecoder *, void *);
 extern "Python" FLAC__StreamDecoderWriteStatus _write_callback(const FLAC__StreamDecoder *, const FLAC__Frame *, const FLAC__int32 const **, void *);
 extern "Python" void _metadata_callback(const FLAC__StreamDecoder *, const FLAC__StreamMetadata *, void *);
 extern "Python" void _error_callback(const FLAC__StreamDecoder *, FLAC__StreamDecoderErrorStatus, void *);
 
+// HELPERS
+void pyflac_interleave_int8(const FLAC__int32 * const buffer[], uint32_t channels, uint32_t blocksize, int8_t *output);
+void pyflac_interleave_int16(const FLAC__int32 * const buffer[], uint32_t channels, uint32_t blocksize, int16_t *output);
+void pyflac_interleave_int32(const FLAC__int32 * const buffer[], uint32_t channels, uint32_t blocksize, int32_t *output);
+
 // CONSTRUCTOR / DESTRUCTOR
 FLAC__StreamDecoder *FLAC__stream_decoder_new(void);
 void FLAC__stream_decoder_delete(FLAC__StreamDecoder *decoder);
@@ -409,6 +405,8 @@ uint32_t FLAC__stream_decoder_get_blocksize(const FLAC__StreamDecoder *decoder);
 FLAC__bool FLAC__stream_decoder_get_decode_position(const FLAC__StreamDecoder *decoder, FLAC__uint64 *position);
 
 // PROCESSING
+// Only the native FLAC stream and file initialisers are declared: the bundled
+// libFLAC is built without Ogg, and a C FILE * cannot be passed from Python.
 FLAC__StreamDecoderInitStatus FLAC__stream_decoder_init_stream(
     FLAC__StreamDecoder *decoder,
     FLAC__StreamDecoderReadCallback read_callback,
@@ -421,34 +419,6 @@ FLAC__StreamDecoderInitStatus FLAC__stream_decoder_init_stream(
     FLAC__StreamDecoderErrorCallback error_callback,
     void *client_data
 );
-FLAC__StreamDecoderInitStatus FLAC__stream_decoder_init_ogg_stream(
-    FLAC__StreamDecoder *decoder,
-    FLAC__StreamDecoderReadCallback read_callback,
-    FLAC__StreamDecoderSeekCallback seek_callback,
-    FLAC__StreamDecoderTellCallback tell_callback,
-    FLAC__StreamDecoderLengthCallback length_callback,
-    FLAC__StreamDecoderEofCallback eof_callback,
-    FLAC__StreamDecoderWriteCallback write_callback,
-    FLAC__StreamDecoderMetadataCallback metadata_callback,
-    FLAC__StreamDecoderErrorCallback error_callback,
-    void *client_data
-);
-FLAC__StreamDecoderInitStatus FLAC__stream_decoder_init_FILE(
-    FLAC__StreamDecoder *decoder,
-    FILE *file,
-    FLAC__StreamDecoderWriteCallback write_callback,
-    FLAC__StreamDecoderMetadataCallback metadata_callback,
-    FLAC__StreamDecoderErrorCallback error_callback,
-    void *client_data
-);
-FLAC__StreamDecoderInitStatus FLAC__stream_decoder_init_ogg_FILE(
-    FLAC__StreamDecoder *decoder,
-    FILE *file,
-    FLAC__StreamDecoderWriteCallback write_callback,
-    FLAC__StreamDecoderMetadataCallback metadata_callback,
-    FLAC__StreamDecoderErrorCallback error_callback,
-    void *client_data
-);
 FLAC__StreamDecoderInitStatus FLAC__stream_decoder_init_file(
     FLAC__StreamDecoder *decoder,
     const char *filename,
@@ -457,14 +427,6 @@ FLAC__StreamDecoderInitStatus FLAC__stream_decoder_init_file(
     FLAC__StreamDecoderErrorCallback error_callback,
     void *client_data
 );
-FLAC__StreamDecoderInitStatus FLAC__stream_decoder_init_ogg_file(
-    FLAC__StreamDecoder *decoder,
-    const char *filename,
-    FLAC__StreamDecoderWriteCallback write_callback,
-    FLAC__StreamDecoderMetadataCallback metadata_callback,
-    FLAC__StreamDecoderErrorCallback error_callback,
-    void *client_data
-);
 FLAC__bool FLAC__stream_decoder_finish(FLAC__StreamDecoder *decoder);
 FLAC__bool FLAC__stream_decoder_flush(FLAC__StreamDecoder *decoder);
 FLAC__bool FLAC__stream_decoder_reset(FLAC__StreamDecoder *decoder);
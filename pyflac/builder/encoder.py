@@ -114,6 +114,9 @@ typedef struct {
 } FLAC__StreamEncoder;
 
 // METADATA
+// The blocks only referenced through pointers, and the picture types, are left
+// opaque as pyFLAC never reads them. The blocks held in the FLAC__StreamMetadata
+// union must still be declared in full, so that CFFI knows the size of the union.
 typedef enum {
     FLAC__METADATA_TYPE_STREAMINFO = 0,
     FLAC__METADATA_TYPE_PADDING = 1,
@@ -145,11 +148,7 @@ typedef struct {
     FLAC__byte *data;
 } FLAC__StreamMetadata_Application;
 
-typedef struct {
-    FLAC__uint64 sample_number;
-    FLAC__uint64 stream_offset;
-    uint32_t frame_samples;
-} FLAC__StreamMetadata_SeekPoint;
+typedef struct { ...; } FLAC__StreamMetadata_SeekPoint;
 
 typedef struct {
     uint32_t num_points;
@@ -167,20 +166,7 @@ typedef struct {
     FLAC__StreamMetadata_VorbisComment_Entry *comments;
 } FLAC__StreamMetadata_VorbisComment;
 
-typedef struct {
-    FLAC__uint64 offset;
-    FLAC__byte number;
-} FLAC__StreamMetadata_CueSheet_Index;
-
-typedef struct {
-    FLAC__uint64 offset;
-    FLAC__byte number;
-    char isrc[13];
-    uint32_t type:1;
-    uint32_t pre_emphasis:1;
-    FLAC__byte num_indices;
-    FLAC__StreamMetadata_CueSheet_Index *indices;
-} FLAC__StreamMetadata_CueSheet_Track;
+typedef struct { ...; } FLAC__StreamMetadata_CueSheet_Track;
 
 typedef struct {
     char media_catalog_number[129];
@@ -190,30 +176,7 @@ typedef struct {
     FLAC__StreamMetadata_CueSheet_Track *tracks;
 } FLAC__StreamMetadata_CueSheet;
 
-typedef enum {
-    FLAC__STREAM_METADATA_PICTURE_TYPE_OTHER = 0, /**< Other */
-    FLAC__STREAM_METADATA_PICTURE_TYPE_FILE_ICON_STANDARD = 1, /**< 32x32 pixels 'file icon' (PNG only) */
-    FLAC__STREAM_METADATA_PICTURE_TYPE_FILE_ICON = 2, /**< Other file icon */
-    FLAC__STREAM_METADATA_PICTURE_TYPE_FRONT_COVER = 3, /**< Cover (front) */
-    FLAC__STREAM_METADATA_PICTURE_TYPE_BACK_COVER = 4, /**< Cover (back) */
-    FLAC__STREAM_METADATA_PICTURE_TYPE_LEAFLET_PAGE = 5, /**< Leaflet page */
-    FLAC__STREAM_METADATA_PICTURE_TYPE_MEDIA = 6, /**< Media (e.g. label side of CD) */
-    FLAC__STREAM_METADATA_PICTURE_TYPE_LEAD_ARTIST = 7, /**< Lead artist/lead performer/soloist */
-    FLAC__STREAM_METADATA_PICTURE_TYPE_ARTIST = 8, /**< Artist/performer */
-    FLAC__STREAM_METADATA_PICTURE_TYPE_CONDUCTOR = 9, /**< Conductor */
-    FLAC__STREAM_METADATA_PICTURE_TYPE_BAND = 10, /**< Band/Orchestra */
-    FLAC__STREAM_METADATA_PICTURE_TYPE_COMPOSER = 11, /**< Composer */
-    FLAC__STREAM_METADATA_PICTURE_TYPE_LYRICIST = 12, /**< Lyricist/text writer */
-    FLAC__STREAM_METADATA_PICTURE_TYPE_RECORDING_LOCATION = 13, /**< Recording Location */
-    FLAC__STREAM_METADATA_PICTURE_TYPE_DURING_RECORDING = 14, /**< During recording */
-    FLAC__STREAM_METADATA_PICTURE_TYPE_DURING_PERFORMANCE = 15, /**< During performance */
-    FLAC__STREAM_METADATA_PICTURE_TYPE_VIDEO_SCREEN_CAPTURE = 16, /**< Movie/video screen capture */
-    FLAC__STREAM_METADATA_PICTURE_TYPE_FISH = 17, /**< A bright coloured fish */
-    FLAC__STREAM_METADATA_PICTURE_TYPE_ILLUSTRATION = 18, /**< Illustration */
-    FLAC__STREAM_METADATA_PICTURE_TYPE_BAND_LOGOTYPE = 19, /**< Band/artist logotype */
-    FLAC__STREAM_METADATA_PICTURE_TYPE_PUBLISHER_LOGOTYPE = 20, /**< Publisher/Studio logotype */
-    FLAC__STREAM_METADATA_PICTURE_TYPE_UNDEFINED
-} FLAC__StreamMetadata_Picture_Type;
+typedef int... FLAC__StreamMetadata_Picture_Type;
 
 typedef struct {
     FLAC__StreamMetadata_Picture_Type type;
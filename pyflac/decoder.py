@@ -9,13 +9,12 @@
 #
 # ------------------------------------------------------------------------------
 
-from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from enum import Enum
 import logging
 from pathlib import Path
-import tempfile
+import queue
 import threading
-import time
 from typing import Callable, Tuple
 
 import numpy as np
@@ -24,6 +23,26 @@ import soundfile as sf
 from pyflac._decoder import ffi as _ffi
 from pyflac._decoder import lib as _lib
 
+# The number of samples buffered by the `FileDecoder` between writes to the WAV file
+_WRITE_BUFFER_SIZE = 65536
+
+# The WAV subtype to write for each of the supported bit depths
+_SUBTYPES = {
+    8: 'PCM_U8',
+    16: 'PCM_16',
+    24: 'PCM_24',
+    32: 'PCM_32',
+}
+
+# The output data type, CFFI array type and C interleaving helper for each supported bit depth,
+# the samples are right-aligned in the output, so 24-bit audio is output as int32 in the range ±2^23
+_INTERLEAVERS = {
+    8: (np.int8, 'int8_t[]', _lib.pyflac_interleave_int8),
+    16: (np.int16, 'int16_t[]', _lib.pyflac_interleave_int16),
+    24: (np.int32, 'int32_t[]', _lib.pyflac_interleave_int32),
+    32: (np.int32, 'int32_t[]', _lib.pyflac_interleave_int32),
+}
+
 
 # -- State
 
@@ -43,7 +62,23 @@ class DecoderState(Enum):
     UNINITIALIZED = _lib.FLAC__STREAM_DECODER_UNINITIALIZED
 
     def __str__(self):
-        return _ffi.string(_lib.FLAC__StreamDecoderStateString[self.value]).decode()
+        return _STATE_STRINGS[self]
+
+
+# The libFLAC descriptions of the decoder states, initialisation and error statuses,
+# decoded once rather than each time an error is reported
+_STATE_STRINGS = {
+    state: _ffi.string(_lib.FLAC__StreamDecoderStateString[state.value]).decode()
+    for state in DecoderState
+}
+_INIT_STATUS_STRINGS = {
+    code: _ffi.string(_lib.FLAC__StreamDecoderInitStatusString[code]).decode()
+    for code in range(_lib.FLAC__STREAM_DECODER_INIT_STATUS_ALREADY_INITIALIZED + 1)
+}
+_ERROR_STATUS_STRINGS = {
+    code: _ffi.string(_lib.FLAC__StreamDecoderErrorStatusString[code]).decode()
+    for code in range(_lib.FLAC__STREAM_DECODER_ERROR_STATUS_BAD_METADATA + 1)
+}
 
 
 # -- Exceptions
@@ -57,7 +92,7 @@ class DecoderInitException(Exception):
         self.code = code
 
     def __str__(self):
-        return _ffi.string(_lib.FLAC__StreamDecoderInitStatusString[self.code]).decode()
+        return _INIT_STATUS_STRINGS[self.code]
 
 
 class DecoderProcessException(Exception):
@@ -82,6 +117,7 @@ class _Decoder:
         This instance is automatically released when there are no more references to the decoder.
         """
         self._error = None
+        self._condition = threading.Condition()
         self._decoder = _ffi.gc(_lib.FLAC__stream_decoder_new(), _lib.FLAC__stream_decoder_delete)
         self._decoder_handle = _ffi.new_handle(self)
         self.logger = logging.getLogger(__name__)
@@ -95,8 +131,12 @@ class _Decoder:
 
         A well behaved program should always call this at the end, otherwise the processing
         thread will be left running, awaiting more data.
+
+        Returns:
+            (bool): `False` if MD5 checking is enabled and the decoded audio does not
+                match the MD5 signature in the stream, `True` otherwise.
         """
-        _lib.FLAC__stream_decoder_finish(self._decoder)
+        return bool(_lib.FLAC__stream_decoder_finish(self._decoder))
 
     # -- State
 
@@ -112,6 +152,15 @@ class _Decoder:
     def process(self):
         raise NotImplementedError
 
+    def _output_buffer(self, num_samples: int, num_channels: int, dtype: np.dtype) -> np.ndarray:
+        """
+        Internal function to return the array to decode the next frame into.
+
+        A new array is returned for every frame, as the user's callback
+        is free to keep a reference to the data it is given.
+        """
+        return np.empty((num_samples, num_channels), dtype=dtype)
+
 
 class StreamDecoder(_Decoder):
     """
@@ -128,6 +177,16 @@ class StreamDecoder(_Decoder):
     Args:
         write_callback (fn): Function to call when there is uncompressed
             audio data ready, see the example below for more information.
+        max_pending_bytes (int): The maximum number of bytes of FLAC data waiting
+            to be decoded. If set, `process` blocks until the decoder has caught up
+            enough for the new data to fit, otherwise the pending data is unbounded.
+        batch_frames (int): The number of decoded frames to pass to the
+            `write_callback` at once, which reduces the number of callbacks for
+            streams with small blocks at the cost of latency. Any remaining
+            frames are passed to the callback in `finish`.
+        queue_frames (int): If set, the `write_callback` is called from a separate
+            thread, with up to this many decoded frames (or batches) queued for it,
+            so that slow callbacks, such as writing to a file, overlap with decoding.
 
     Examples:
         An example callback which writes the audio data to file
@@ -158,15 +217,33 @@ class StreamDecoder(_Decoder):
         DecoderInitException: If initialisation of the decoder fails
     """
     def __init__(self,
-                 write_callback: Callable[[np.ndarray, int, int, int], None]):
+                 write_callback: Callable[[np.ndarray, int, int, int], None],
+                 max_pending_bytes: int = None,
+                 batch_frames: int = 1,
+                 queue_frames: int = 0):
         super().__init__()
 
         self._done = False
-        self._buffer = deque()
-        self._event = threading.Event()
-        self._lock = threading.Lock()
+        self._buffer = bytearray()
+        self.max_pending_bytes = max_pending_bytes
+        self.batch_frames = batch_frames
         self.write_callback = write_callback
 
+        self._queue = None
+        if queue_frames > 0:
+            self._queue = queue.Queue(maxsize=queue_frames)
+            self._callback_thread = threading.Thread(target=self._process_queue, args=(write_callback,))
+            self._callback_thread.daemon = True
+            self.write_callback = self._queue_callback
+
+        self._batch = None
+        self._batched = 0
+        self._batched_frames = 0
+        self._batch_sample_rate = None
+        if batch_frames > 1:
+            self._batch_write_callback = self.write_callback
+            self.write_callback = self._batch_callback
+
         rc = _lib.FLAC__stream_decoder_init_stream(
             self._decoder,
             _lib._read_callback,
@@ -182,6 +259,9 @@ class StreamDecoder(_Decoder):
         if rc != _lib.FLAC__STREAM_DECODER_INIT_STATUS_OK:
             raise DecoderInitException(rc)
 
+        if self._queue is not None:
+            self._callback_thread.start()
+
         self._thread = threading.Thread(target=self._process)
         self._thread.daemon = True
         self._thread.start()
@@ -196,20 +276,32 @@ class StreamDecoder(_Decoder):
         if not _lib.FLAC__stream_decoder_process_until_end_of_stream(self._decoder):
             self._error = 'A fatal read, write, or memory allocation error occurred'
 
+        with self._condition:
+            self._condition.notify_all()
+
     def process(self, data: bytes):
         """
         Instruct the decoder to process some data.
 
         Note: This is a non-blocking function, data is processed in
-        a background thread.
+        a background thread. If `max_pending_bytes` is set, it blocks
+        while the data waiting to be decoded would exceed the limit.
 
         Args:
             data (bytes): Bytes of FLAC data
         """
-        self._lock.acquire()
-        self._buffer.append(data)
-        self._lock.release()
-        self._event.set()
+        with self._condition:
+            if self.max_pending_bytes:
+                # ----------------------------------------------------------
+                # Wait for the decoder to make room, an empty buffer always
+                # accepts the data, so a single large block cannot deadlock.
+                # ----------------------------------------------------------
+                self._condition.wait_for(
+                    lambda: len(self._buffer) + len(data) <= self.max_pending_bytes or not self._buffer
+                    or self._error is not None or not self._thread.is_alive()
+                )
+            self._buffer += data
+            self._condition.notify_all()
 
     def finish(self):
         """
@@ -225,21 +317,94 @@ class StreamDecoder(_Decoder):
                 error occurred.
         """
         # --------------------------------------------------------------
-        # Finish processing what's in the buffer if there are no errors
-        # --------------------------------------------------------------
-        while self._thread.is_alive() and self._error is None and len(self._buffer) > 0:
-            time.sleep(0.01)
-
-        # --------------------------------------------------------------
-        # Instruct the decoder to finish up and wait until it is done
+        # Finish processing what's in the buffer if there are no errors,
+        # then instruct the decoder to finish up and wait until it is done
         # --------------------------------------------------------------
-        self._done = True
-        self._event.set()
+        with self._condition:
+            self._condition.wait_for(
+                lambda: not self._buffer or self._error is not None or not self._thread.is_alive()
+            )
+            self._done = True
+            self._condition.notify_all()
         self._thread.join()
         super().finish()
+        if self._batched:
+            self._flush_batch()
+        if self._queue:
+            self._queue.put(None)
+            self._callback_thread.join()
         if self._error:
             raise DecoderProcessException(self._error)
 
+    def _queue_callback(self, data: np.ndarray, sample_rate: int, num_channels: int, num_samples: int):
+        """
+        Internal callback to queue the decoded data for the callback thread,
+        this blocks while the queue is full.
+        """
+        self._queue.put((data, sample_rate, num_channels, num_samples))
+
+    def _process_queue(self, write_callback: Callable[[np.ndarray, int, int, int], None]):
+        """
+        Internal function to pass the queued data to the user's callback until
+        `finish` queues `None`. This should be run in a separate thread.
+
+        If the callback raises an exception, decoding is aborted, and the rest of
+        the queue is discarded so that the decoder thread cannot block on it.
+        """
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            if self._error is not None:
+                continue
+            try:
+                write_callback(*item)
+            except Exception:
+                self.logger.exception('Error in the write callback')
+                with self._condition:
+                    self._error = 'An exception was raised in the write callback'
+                    self._condition.notify_all()
+
+    def _output_buffer(self, num_samples: int, num_channels: int, dtype: np.dtype) -> np.ndarray:
+        """
+        Internal function to return the array to decode the next frame into.
+
+        When batching, the frame is decoded directly into the free space at the
+        end of the current batch, passing the batch to the user first if the frame
+        does not fit. A new batch is allocated each time, as the user's callback
+        is free to keep a reference to the data it is given.
+        """
+        if self.batch_frames <= 1:
+            return super()._output_buffer(num_samples, num_channels, dtype)
+
+        if self._batch is not None and (self._batched + num_samples > len(self._batch) or
+                                        self._batch.shape[1] != num_channels or self._batch.dtype != dtype):
+            self._flush_batch()
+        if self._batch is None:
+            self._batch = np.empty((num_samples * self.batch_frames, num_channels), dtype=dtype)
+        return self._batch[self._batched:self._batched + num_samples]
+
+    def _batch_callback(self, data: np.ndarray, sample_rate: int, num_channels: int, num_samples: int):
+        """
+        Internal callback to count the frames decoded into the current batch,
+        and pass the batch to the user once it holds `batch_frames` frames.
+        """
+        self._batched += num_samples
+        self._batched_frames += 1
+        self._batch_sample_rate = sample_rate
+        if self._batched_frames >= self.batch_frames:
+            self._flush_batch()
+
+    def _flush_batch(self):
+        """
+        Internal function to pass the batched frames to the user's callback.
+        """
+        batch = self._batch[:self._batched]
+        self._batch = None
+        self._batched = 0
+        self._batched_frames = 0
+        self._batch_write_callback(batch, self._batch_sample_rate, batch.shape[1], len(batch))
+
 
 class FileDecoder(_Decoder):
     """
@@ -248,35 +413,53 @@ class FileDecoder(_Decoder):
 
     Args:
         input_file (pathlib.Path): Path to the input FLAC file
-        output_file (pathlib.Path): Path to the output WAV file, a temporary
-            file will be created if unspecified.
+        output_file (pathlib.Path): Path to the output WAV file, if unspecified
+            the audio data is decoded in memory without writing a WAV file.
+        md5_checking (bool): If `True`, the decoded audio is checked against
+            the MD5 signature stored in the FLAC file. This is disabled by
+            default, as hashing every decoded sample slows down decoding.
+        workers (int): The number of threads to decode the file with, each
+            seeking to and decoding an equal share of the samples. This requires
+            the total number of samples in the STREAMINFO block, and is not
+            used if MD5 checking is enabled, as the MD5 signature covers the
+            whole stream. With several workers, the whole decoded stream is held
+            in memory, even when writing to a WAV file. If any range cannot be
+            decoded cleanly, e.g. the file is shorter than its STREAMINFO block
+            reports, the file is decoded again with a single worker, so that the
+            result does not depend on the number of workers.
 
     Raises:
         DecoderInitException: If initialisation of the decoder fails
     """
     def __init__(self,
                  input_file: Path,
-                 output_file: Path = None):
+                 output_file: Path = None,
+                 md5_checking: bool = False,
+                 workers: int = 1):
         super().__init__()
 
+        self.__input_file = input_file
+        self.__workers = 1 if md5_checking else workers
         self.__output = None
+        self.__output_file = output_file
+        self.__buffer = None
+        self.__buffered = 0
+        self.__blocks = []
+        self.__sample_rate = None
+        self.__bits_per_sample = None
         self.write_callback = self._write_callback
-        if output_file:
-            self.__output_file = output_file
-        else:
-            output_file = tempfile.NamedTemporaryFile(suffix='.wav')
-            self.__output_file = Path(output_file.name)
+        self.metadata_callback = self._metadata_callback
+
+        _lib.FLAC__stream_decoder_set_md5_checking(self._decoder, md5_checking)
 
-        c_input_filename = _ffi.new('char[]', str(input_file).encode('utf-8'))
         rc = _lib.FLAC__stream_decoder_init_file(
             self._decoder,
-            c_input_filename,
+            str(input_file).encode('utf-8'),
             _lib._write_callback,
-            _ffi.NULL,
+            _lib._metadata_callback,
             _lib._error_callback,
             self._decoder_handle,
         )
-        _ffi.release(c_input_filename)
         if rc != _lib.FLAC__STREAM_DECODER_INIT_STATUS_OK:
             raise DecoderInitException(rc)
 
@@ -289,28 +472,219 @@ class FileDecoder(_Decoder):
 
         Raises:
             DecoderProcessException: if any fatal read, write, or memory allocation
-                error occurred (meaning decoding must stop)
+                error occurred (meaning decoding must stop), or if MD5 checking is
+                enabled and the decoded audio does not match the MD5 signature.
         """
-        result = _lib.FLAC__stream_decoder_process_until_end_of_stream(self._decoder)
-        if self.state != DecoderState.END_OF_STREAM and not result:
-            raise DecoderProcessException(str(self.state))
+        if self.__workers > 1:
+            if not _lib.FLAC__stream_decoder_process_until_end_of_metadata(self._decoder):
+                raise DecoderProcessException(str(self.state))
 
-        self.finish()
+        if not (self.__workers > 1 and self.__buffer is not None and self._process_workers()):
+            result = _lib.FLAC__stream_decoder_process_until_end_of_stream(self._decoder)
+            if not result and \
+                    _lib.FLAC__stream_decoder_get_state(self._decoder) != _lib.FLAC__STREAM_DECODER_END_OF_STREAM:
+                raise DecoderProcessException(str(self.state))
 
-        if self.__output:
+        md5_ok = self.finish()
+
+        if self.__output is not None:
+            self._flush()
             self.__output.close()
+        elif self.__buffered:
+            self.__blocks.append(self.__buffer[:self.__buffered])
+
+        if not md5_ok:
+            raise DecoderProcessException('MD5 signature mismatch')
+
+        if self.__output is not None:
             return sf.read(str(self.__output_file), always_2d=True)
 
+        if self.__blocks:
+            # --------------------------------------------------------------
+            # Scale the integer samples to floating point in the same way
+            # as reading them back from a WAV file with SoundFile.
+            # --------------------------------------------------------------
+            scale = 1.0 / (1 << (self.__bits_per_sample - 1))
+            data = np.concatenate(self.__blocks, dtype=np.float64)
+            data *= scale
+            return data, self.__sample_rate
+
+    def _process_workers(self) -> bool:
+        """
+        Internal function to decode the file with several threads.
+
+        The samples are split into equal ranges, and each range is decoded by
+        its own decoder directly into the buffer holding the whole stream. The
+        libFLAC calls release the GIL, so the workers decode in parallel.
+
+        Returns:
+            (bool): `True` if every range was decoded, or `False` if any range
+                could not be decoded cleanly, and the file should be decoded serially.
+        """
+        total_samples, num_channels = self.__buffer.shape
+        bounds = np.linspace(0, total_samples, self.__workers + 1, dtype=np.int64).tolist()
+        decoders = [
+            _RangeDecoder(self.__input_file, self.__buffer, start, end)
+            for start, end in zip(bounds[:-1], bounds[1:])
+        ]
+        with ThreadPoolExecutor(max_workers=self.__workers) as executor:
+            decoded = list(executor.map(_RangeDecoder.process, decoders))
+
+        if not all(decoded):
+            self.logger.warning('The file could not be decoded with several workers, decoding it with one')
+            return False
+
+        self._write_callback(self.__buffer, self.__sample_rate, num_channels, total_samples)
+        return True
+
+    def _metadata_callback(self, metadata):
+        """
+        Internal callback to handle the STREAMINFO metadata block.
+
+        When decoding in memory or with several workers, and the stream reports
+        its total number of samples, the buffer is allocated to hold the whole
+        decoded stream, so that no further buffers are allocated while decoding.
+        """
+        stream_info = metadata.data.stream_info
+        self.__sample_rate = stream_info.sample_rate
+        self.__bits_per_sample = stream_info.bits_per_sample
+        if self.__output_file and self.__workers <= 1:
+            return
+        if not stream_info.total_samples or stream_info.bits_per_sample not in _INTERLEAVERS:
+            return
+
+        dtype = _INTERLEAVERS[stream_info.bits_per_sample][0]
+        self.__buffer = np.empty((stream_info.total_samples, stream_info.channels), dtype=dtype)
+
+    def _output_buffer(self, num_samples: int, num_channels: int, dtype: np.dtype) -> np.ndarray:
+        """
+        Internal function to return the array to decode the next frame into.
+
+        The frame is decoded directly into the free space at the end of
+        the write buffer, flushing it to the WAV file first if it is full.
+        """
+        if self.__buffer is None:
+            self.__buffer = np.empty((_WRITE_BUFFER_SIZE, num_channels), dtype=dtype)
+
+        if self.__buffered + num_samples > len(self.__buffer):
+            self._flush()
+        return self.__buffer[self.__buffered:self.__buffered + num_samples]
+
     def _write_callback(self, data: np.ndarray, sample_rate: int, num_channels: int, num_samples: int):
         """
         Internal callback to write the decoded data to a WAV file.
+
+        The decoded blocks are already in the write buffer (see `_output_buffer`),
+        which is written to the file once full, rather than writing each block separately.
         """
-        if self.__output is None:
+        if self.__output is None and self.__output_file:
             self.__output = sf.SoundFile(
                 self.__output_file, mode='w', channels=num_channels,
-                samplerate=sample_rate
+                samplerate=sample_rate, subtype=_SUBTYPES[self.__bits_per_sample]
             )
-        self.__output.write(data)
+        self.__sample_rate = sample_rate
+        self.__buffered += num_samples
+
+    def _flush(self):
+        """
+        Internal function to write the buffered data to the WAV file.
+
+        Without an output file, the full buffer is kept as a block of the
+        decoded audio, and a new buffer is allocated for the next frames.
+        """
+        if self.__output is not None:
+            # ----------------------------------------------------------
+            # SoundFile expects full scale int16 or int32 data, so 8-bit
+            # and 24-bit samples are shifted up from the right-aligned
+            # decoded data.
+            # ----------------------------------------------------------
+            data = self.__buffer[:self.__buffered]
+            if self.__bits_per_sample == 8:
+                data = data.astype(np.int16) << 8
+            elif self.__bits_per_sample == 24:
+                data = data << 8
+            self.__output.write(data)
+        else:
+            self.__blocks.append(self.__buffer[:self.__buffered])
+            self.__buffer = np.empty((_WRITE_BUFFER_SIZE, self.__buffer.shape[1]), dtype=self.__buffer.dtype)
+        self.__buffered = 0
+
+
+class _RangeDecoder(_Decoder):
+    """
+    An internal decoder for a range of samples of a FLAC file, which is
+    decoded directly into the matching rows of an array holding the whole
+    stream. This is used by the `FileDecoder` to decode with several workers.
+
+    Args:
+        input_file (pathlib.Path): Path to the input FLAC file
+        output (np.ndarray): The array holding the whole decoded stream
+        start (int): The first sample to decode
+        end (int): The sample to stop decoding at
+
+    Raises:
+        DecoderInitException: If initialisation of the decoder fails
+    """
+    def __init__(self,
+                 input_file: Path,
+                 output: np.ndarray,
+                 start: int,
+                 end: int):
+        super().__init__()
+
+        self._output = output
+        self._position = start
+        self._start = start
+        self._end = end
+        self.write_callback = self._write_callback
+
+        rc = _lib.FLAC__stream_decoder_init_file(
+            self._decoder,
+            str(input_file).encode('utf-8'),
+            _lib._write_callback,
+            _ffi.NULL,
+            _lib._error_callback,
+            self._decoder_handle,
+        )
+        if rc != _lib.FLAC__STREAM_DECODER_INIT_STATUS_OK:
+            raise DecoderInitException(rc)
+
+    def process(self) -> bool:
+        """
+        Seek to the start of the range, and decode frames until the end of it.
+
+        Returns:
+            (bool): `True` if the whole range was decoded, or `False` if seeking
+                failed, the stream ended early, or any error occurred.
+        """
+        result = _lib.FLAC__stream_decoder_seek_absolute(self._decoder, self._start)
+        while result and self._position < self._end and self._error is None:
+            result = _lib.FLAC__stream_decoder_process_single(self._decoder) and \
+                _lib.FLAC__stream_decoder_get_state(self._decoder) != _lib.FLAC__STREAM_DECODER_END_OF_STREAM
+
+        self.finish()
+        return bool(result) and self._error is None
+
+    def _output_buffer(self, num_samples: int, num_channels: int, dtype: np.dtype) -> np.ndarray:
+        """
+        Internal function to return the array to decode the next frame into.
+
+        Frames within the range are decoded directly into the output, whereas
+        the last frame, which overlaps the next range, is decoded separately.
+        """
+        if self._position + num_samples <= self._end:
+            return self._output[self._position:self._position + num_samples]
+        return np.empty((num_samples, num_channels), dtype=dtype)
+
+    def _write_callback(self, data: np.ndarray, sample_rate: int, num_channels: int, num_samples: int):
+        """
+        Internal callback to advance through the range, copying only the
+        samples of the last frame that fall within the range.
+        """
+        count = min(num_samples, self._end - self._position)
+        if count < num_samples:
+            self._output[self._position:self._end] = data[:count]
+        self._position += count
 
 
 class OneShotDecoder(_Decoder):
@@ -361,12 +735,8 @@ class OneShotDecoder(_Decoder):
                  write_callback: Callable[[np.ndarray, int, int, int], None],
                  buffer: bytes):
         super().__init__()
-        self._done = False
-        self._buffer = deque()
-        self._buffer.append(buffer)
-        self._event = threading.Event()
-        self._event.set()
-        self._lock = threading.Lock()
+        self._done = True
+        self._buffer = bytearray(buffer)
         self.write_callback = write_callback
 
         rc = _lib.FLAC__stream_decoder_init_stream(
@@ -384,10 +754,7 @@ class OneShotDecoder(_Decoder):
         if rc != _lib.FLAC__STREAM_DECODER_INIT_STATUS_OK:
             raise DecoderInitException(rc)
 
-        while len(self._buffer) > 0:
-            _lib.FLAC__stream_decoder_process_single(self._decoder)
-
-        self._done = True
+        _lib.FLAC__stream_decoder_process_until_end_of_stream(self._decoder)
         super().finish()
 
 
@@ -403,82 +770,47 @@ def _read_callback(_decoder,
     """
     decoder = _ffi.from_handle(client_data)
 
-    # ----------------------------------------------------------
-    # Wait until there is something in the buffer, or an error
-    # occurs, or the end of the stream is reached.
-    # ----------------------------------------------------------
-    decoder._event.wait()
-    if decoder._error:
+    with decoder._condition:
         # ----------------------------------------------------------
-        # If an error has been issued via the error callback, then
-        # abort the processing of the stream.
+        # Wait until there is something in the buffer, or an error
+        # occurs, or the end of the stream is reached.
         # ----------------------------------------------------------
-        return _lib.FLAC__STREAM_DECODER_READ_STATUS_ABORT
+        decoder._condition.wait_for(lambda: decoder._buffer or decoder._error or decoder._done)
+        if decoder._error:
+            # ----------------------------------------------------------
+            # If an error has been issued via the error callback, then
+            # abort the processing of the stream.
+            # ----------------------------------------------------------
+            return _lib.FLAC__STREAM_DECODER_READ_STATUS_ABORT
+
+        if not decoder._buffer:
+            # ----------------------------------------------------------
+            # The buffer is drained, and the end of the stream has been
+            # instructed by a call to finish, or all the data was given
+            # up front to the one-shot decoder.
+            # ----------------------------------------------------------
+            num_bytes[0] = 0
+            return _lib.FLAC__STREAM_DECODER_READ_STATUS_END_OF_STREAM
 
-    if decoder._done:
-        # ----------------------------------------------------------
-        # The end of the stream has been instructed by a call to
-        # finish.
-        # ----------------------------------------------------------
-        num_bytes[0] = 0
-        return _lib.FLAC__STREAM_DECODER_READ_STATUS_END_OF_STREAM
-
-    # --------------------------------------------------------------
-    # Ensure only the maximum bytes or less is taken from
-    # the thread safe queue.
-    # --------------------------------------------------------------
-    data = bytes()
-    maximum_bytes = int(num_bytes[0])
-    decoder._lock.acquire()
-    if len(decoder._buffer[0]) <= maximum_bytes:
-        data = decoder._buffer.popleft()
-        maximum_bytes -= len(data)
-
-    if len(decoder._buffer) > 0 and len(decoder._buffer[0]) > maximum_bytes:
-        data += decoder._buffer[0][0:maximum_bytes]
-        decoder._buffer[0] = decoder._buffer[0][maximum_bytes:]
+        # --------------------------------------------------------------
+        # Copy the maximum bytes or less straight from the buffer into
+        # libFLAC's input buffer, then drop them from the front of the
+        # buffer, which does not move the remaining data.
+        # --------------------------------------------------------------
+        actual_bytes = min(len(decoder._buffer), int(num_bytes[0]))
+        with memoryview(decoder._buffer) as data:
+            _ffi.memmove(byte_buffer, data[:actual_bytes], actual_bytes)
+        del decoder._buffer[:actual_bytes]
+        num_bytes[0] = actual_bytes
 
-    # --------------------------------------------------------------
-    # If there is no more data to process from the buffer, then
-    # clear the event, the thread will await more data to process.
-    # --------------------------------------------------------------
-    if len(decoder._buffer) == 0 or (len(decoder._buffer) > 0 and len(decoder._buffer[0]) == 0):
-        decoder._event.clear()
-    decoder._lock.release()
+        # --------------------------------------------------------------
+        # Wake up `finish` in case it is waiting for the buffer to drain.
+        # --------------------------------------------------------------
+        decoder._condition.notify_all()
 
-    actual_bytes = len(data)
-    num_bytes[0] = actual_bytes
-    _ffi.memmove(byte_buffer, data, actual_bytes)
     return _lib.FLAC__STREAM_DECODER_READ_STATUS_CONTINUE
 
 
-@_ffi.def_extern()
-def _seek_callback(_decoder,
-                   absolute_byte_offset,
-                   client_data):
-    raise NotImplementedError
-
-
-@_ffi.def_extern()
-def _tell_callback(_decoder,
-                   absolute_byte_offset,
-                   client_data):
-    raise NotImplementedError
-
-
-@_ffi.def_extern()
-def _length_callback(_decoder,
-                     stream_length,
-                     client_data):
-    raise NotImplementedError
-
-
-@_ffi.def_extern()
-def _eof_callback(_decoder,
-                  client_data):
-    raise NotImplementedError
-
-
 @_ffi.def_extern(error=_lib.FLAC__STREAM_DECODER_WRITE_STATUS_ABORT)
 def _write_callback(_decoder,
                     frame,
@@ -490,38 +822,36 @@ def _write_callback(_decoder,
 
     If an exception is raised here, the abort status is returned.
     """
-    channels = []
     decoder = _ffi.from_handle(client_data)
-
-    # --------------------------------------------------------------
-    # Data comes from libFLAC in a 32bit array, where the 16bit
-    # audio data sits in the least significant bits.
-    # --------------------------------------------------------------
-    bytes_per_frame = frame.header.blocksize * np.dtype(np.int32).itemsize
-
-    if frame.header.bits_per_sample not in (16, 32):
-        raise ValueError('Only int16/int32 data type is supported')
+    header = frame.header
+    num_channels = int(header.channels)
+    num_samples = int(header.blocksize)
 
     # --------------------------------------------------------------
     # The buffer contains an array of pointers to decoded channels
-    # of data. Each pointer will point to an array of signed samples
-    # of length `frame.header.blocksize`.
+    # of data. Each pointer will point to an array of signed 32bit
+    # samples of length `frame.header.blocksize`, where 16bit audio
+    # data sits in the least significant bits.
     #
     # Channels will be ordered according to the FLAC specification.
+    #
+    # The channels are interleaved into the output array in a single
+    # call to the C helper specialised for the bit depth, rather than
+    # per channel in Python.
     # --------------------------------------------------------------
-    for ch in range(0, frame.header.channels):
-        cbuffer = _ffi.buffer(buffer[ch], bytes_per_frame)
-        npbuffer = np.frombuffer(cbuffer, dtype='int32')
-        if frame.header.bits_per_sample == 16:
-            channels.append(npbuffer.astype(np.int16))
-        elif frame.header.bits_per_sample == 32:
-            channels.append(npbuffer)
-    output = np.column_stack(channels)
+    try:
+        dtype, ctype, interleave = _INTERLEAVERS[header.bits_per_sample]
+    except KeyError:
+        raise ValueError('Only 8, 16, 24 and 32 bits per sample are supported')
+
+    output = decoder._output_buffer(num_samples, num_channels, dtype)
+    interleave(buffer, num_channels, num_samples, _ffi.from_buffer(ctype, output))
+
     decoder.write_callback(
         output,
-        int(frame.header.sample_rate),
-        int(frame.header.channels),
-        int(frame.header.blocksize)
+        int(header.sample_rate),
+        num_channels,
+        num_samples
     )
 
     return _lib.FLAC__STREAM_DECODER_WRITE_STATUS_CONTINUE
@@ -531,7 +861,12 @@ def _write_callback(_decoder,
 def _metadata_callback(_decoder,
                        metadata,
                        client_data):
-    raise NotImplementedError
+    """
+    Called when the decoder has read a metadata block, by
+    default this is only the STREAMINFO block.
+    """
+    decoder = _ffi.from_handle(client_data)
+    decoder.metadata_callback(metadata)
 
 
 @_ffi.def_extern()
@@ -542,8 +877,8 @@ def _error_callback(_decoder,
     Called whenever an error occurs during decoding.
     """
     decoder = _ffi.from_handle(client_data)
-    message = _ffi.string(
-        _lib.FLAC__StreamDecoderErrorStatusString[status]).decode()
+    message = _ERROR_STATUS_STRINGS[status]
     decoder.logger.error(f'Error in libFLAC decoder: {message}')
-    decoder._error = message
-    decoder._event.set()
+    with decoder._condition:
+        decoder._error = message
+        decoder._condition.notify_all()
@@ -11,7 +11,10 @@
 
 from enum import Enum
 import logging
+import mmap
+import os
 from pathlib import Path
+import struct
 import tempfile
 from typing import Callable
 
@@ -21,6 +24,16 @@ import soundfile as sf
 from pyflac._encoder import ffi as _ffi
 from pyflac._encoder import lib as _lib
 
+# The number of samples read from a WAV file at a time by the `FileEncoder`
+_CHUNK_SIZE = 65536
+
+# The WAV format tags for integer PCM data
+_WAVE_FORMAT_PCM = 0x0001
+_WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+# The bit depth that floating point samples are quantised to
+_FLOAT_BITS_PER_SAMPLE = 24
+
 
 # -- State
 
@@ -39,7 +52,19 @@ class EncoderState(Enum):
     MEMORY_ALLOCATION_ERROR = _lib.FLAC__STREAM_ENCODER_MEMORY_ALLOCATION_ERROR
 
     def __str__(self):
-        return _ffi.string(_lib.FLAC__StreamEncoderStateString[self.value]).decode()
+        return _STATE_STRINGS[self]
+
+
+# The libFLAC descriptions of the encoder states and initialisation statuses,
+# decoded once rather than each time an error is reported
+_STATE_STRINGS = {
+    state: _ffi.string(_lib.FLAC__StreamEncoderStateString[state.value]).decode()
+    for state in EncoderState
+}
+_INIT_STATUS_STRINGS = {
+    code: _ffi.string(_lib.FLAC__StreamEncoderInitStatusString[code]).decode()
+    for code in range(_lib.FLAC__STREAM_ENCODER_INIT_STATUS_ALREADY_INITIALIZED + 1)
+}
 
 
 class EncoderInitException(Exception):
@@ -51,7 +76,7 @@ class EncoderInitException(Exception):
         self.code = code
 
     def __str__(self):
-        return _ffi.string(_lib.FLAC__StreamEncoderInitStatusString[self.code]).decode()
+        return _INIT_STATUS_STRINGS[self.code]
 
 
 class EncoderProcessException(Exception):
@@ -74,6 +99,7 @@ class _Encoder:
         This instance is automatically released when there are no more references to the encoder.
         """
         self._initialised = False
+        self._buffer = np.empty(0, dtype=np.int32)
         self._encoder = _ffi.gc(_lib.FLAC__stream_encoder_new(), _lib.FLAC__stream_encoder_delete)
         self._encoder_handle = _ffi.new_handle(self)
         self.logger = logging.getLogger(__name__)
@@ -87,13 +113,18 @@ class _Encoder:
         """
         Process some samples.
 
-        This method ensures the samples are contiguous in memory and then
-        passes a pointer to the numpy array to the FLAC encoder to process.
+        This method ensures the samples are contiguous 32-bit integers in memory
+        and then passes a pointer to the numpy array to the FLAC encoder to process.
+        Samples of any other type are converted in a buffer that is reused between
+        calls, rather than allocating a new array each time.
 
         On processing the first buffer of samples, the encoder is set up
         for the given amount of channels and data type. This is automatically
         determined from the numpy array.
 
+        Floating point samples in the range [-1.0, 1.0] are quantised to
+        24-bit integers, and values outside of this range are clipped.
+
         Raises:
             TypeError: if a numpy array of samples is not provided
             EncoderProcessException: if an error occurs when processing the samples
@@ -106,10 +137,27 @@ class _Encoder:
                 self._channels = samples.shape[1]
             except IndexError:
                 self._channels = 1
-            self._bits_per_sample = samples.dtype.itemsize * 8
+            if np.issubdtype(samples.dtype, np.floating):
+                self._bits_per_sample = _FLOAT_BITS_PER_SAMPLE
+            else:
+                self._bits_per_sample = samples.dtype.itemsize * 8
             self._init()
 
-        samples = np.ascontiguousarray(samples).astype(np.int32)
+        if np.issubdtype(samples.dtype, np.floating):
+            # ----------------------------------------------------------
+            # Scale, round and clip the whole block with numpy, rather
+            # than converting each sample individually.
+            # ----------------------------------------------------------
+            scale = 1 << (_FLOAT_BITS_PER_SAMPLE - 1)
+            samples = np.rint(samples * scale)
+            np.clip(samples, -scale, scale - 1, out=samples)
+
+        if samples.dtype != np.int32 or not samples.flags.c_contiguous:
+            if self._buffer.size < samples.size:
+                self._buffer = np.empty(samples.size, dtype=np.int32)
+            buffer = self._buffer[:samples.size].reshape(samples.shape)
+            np.copyto(buffer, samples, casting='unsafe')
+            samples = buffer
         samples_ptr = _ffi.from_buffer('int32_t[]', samples)
 
         result = _lib.FLAC__stream_encoder_process_interleaved(self._encoder, samples_ptr, len(samples))
@@ -377,14 +425,16 @@ class FileEncoder(_Encoder):
         else:
             raise ValueError(f'WAV input data type must be either PCM_16 or PCM_32: Got {info.subtype}')
 
-        self.__raw_audio, sample_rate = sf.read(str(input_file), dtype=dtype)
+        self.__input_file = input_file
+        self.__dtype = dtype
+        self.__channels = info.channels
         if output_file:
             self.__output_file = output_file
         else:
             output_file = tempfile.NamedTemporaryFile(suffix='.flac')
             self.__output_file = Path(output_file.name)
 
-        self._sample_rate = sample_rate
+        self._sample_rate = info.samplerate
         self._blocksize = blocksize
         self._compression_level = compression_level
         self._streamable_subset = streamable_subset
@@ -397,14 +447,12 @@ class FileEncoder(_Encoder):
         Raises:
             EncoderInitException: if initialisation fails.
         """
-        c_output_filename = _ffi.new('char[]', str(self.__output_file).encode('utf-8'))
         rc = _lib.FLAC__stream_encoder_init_file(
             self._encoder,
-            c_output_filename,
+            str(self.__output_file).encode('utf-8'),
             _lib._progress_callback,
             self._encoder_handle,
         )
-        _ffi.release(c_output_filename)
         if rc != _lib.FLAC__STREAM_ENCODER_INIT_STATUS_OK:
             raise EncoderInitException(rc)
 
@@ -414,18 +462,106 @@ class FileEncoder(_Encoder):
         """
         Process the audio data from the WAV file.
 
+        The WAV file is read and encoded in chunks, so the whole file
+        is never held in memory.
+
         Returns:
             (bytes): The FLAC encoded bytes.
 
         Raises:
             EncoderProcessException: if an error occurs when processing the samples
         """
-        super().process(self.__raw_audio)
+        dtype = np.dtype(self.__dtype).newbyteorder('<')
+        if not self._initialised:
+            self._channels = self.__channels
+            self._bits_per_sample = dtype.itemsize * 8
+            self._init()
+
+        # --------------------------------------------------------------
+        # Feed the encoder a whole number of blocks at a time, so that
+        # libFLAC does not have to hold on to a partial block between
+        # calls. The block size is only known once the encoder has been
+        # initialised, as libFLAC chooses it if set to zero.
+        # --------------------------------------------------------------
+        blocksize = self._blocksize
+        chunk_size = max(blocksize, _CHUNK_SIZE // blocksize * blocksize)
+
+        with open(self.__input_file, 'rb') as f:
+            # ----------------------------------------------------------
+            # The file is read from start to end, so ask the kernel for
+            # more aggressive read ahead where supported.
+            # ----------------------------------------------------------
+            if hasattr(os, 'posix_fadvise'):
+                os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+
+            data = _mmap_wav_pcm(f, dtype)
+            if data is not None:
+                # ----------------------------------------------------------
+                # The PCM data is read straight from the memory mapped file,
+                # which avoids copying the whole file into memory up front.
+                # ----------------------------------------------------------
+                with data:
+                    samples = np.frombuffer(data, dtype=dtype)
+                    samples = samples.reshape(-1, self.__channels)
+                    for start in range(0, len(samples), chunk_size):
+                        super().process(samples[start:start + chunk_size])
+                    del samples
+            else:
+                with sf.SoundFile(f) as sound_file:
+                    for block in sound_file.blocks(blocksize=chunk_size, dtype=self.__dtype, always_2d=True):
+                        super().process(block)
         self.finish()
         with open(self.__output_file, 'rb') as f:
             return f.read()
 
 
+def _mmap_wav_pcm(f, dtype: np.dtype):
+    """
+    Memory map the integer PCM data of a plain RIFF WAV file.
+
+    Args:
+        f (file): The WAV file, opened for reading in binary mode.
+        dtype (numpy.dtype): The expected sample data type.
+
+    Returns:
+        (memoryview): A view of the PCM data, which must be released
+            before the file is closed, or `None` if the file cannot be
+            memory mapped and must be read by SoundFile instead.
+    """
+    try:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+
+    # --------------------------------------------------------------
+    # Walk the RIFF chunks to find the format and the data chunk.
+    # Anything unexpected falls back to SoundFile.
+    # --------------------------------------------------------------
+    fmt = None
+    offset = 12
+    if mapped[:4] == b'RIFF' and mapped[8:12] == b'WAVE':
+        while offset + 8 <= len(mapped):
+            chunk_id, chunk_size = struct.unpack_from('<4sI', mapped, offset)
+            offset += 8
+            if chunk_id == b'fmt ' and chunk_size >= 16:
+                fmt = struct.unpack_from('<HHIIHH', mapped, offset)
+            elif chunk_id == b'data' and fmt is not None:
+                format_tag, channels, _, _, block_align, bits_per_sample = fmt
+                if format_tag in (_WAVE_FORMAT_PCM, _WAVE_FORMAT_EXTENSIBLE) and \
+                        bits_per_sample == dtype.itemsize * 8 and \
+                        block_align == channels * dtype.itemsize:
+                    size = min(chunk_size, len(mapped) - offset)
+                    size -= size % block_align
+                    if hasattr(mapped, 'madvise'):
+                        mapped.madvise(mmap.MADV_SEQUENTIAL)
+                    return memoryview(mapped)[offset:offset + size]
+                break
+            offset += chunk_size + (chunk_size & 1)
+
+    mapped.close()
+    return None
+
+
 @_ffi.def_extern(error=_lib.FLAC__STREAM_ENCODER_WRITE_STATUS_FATAL_ERROR)
 def _write_callback(_encoder,
                     byte_buffer,
@@ -16,6 +16,7 @@ import time
 import unittest
 
 import numpy as np
+import soundfile as sf
 from pyflac.decoder import _Decoder
 from pyflac import (
     FileDecoder,
@@ -93,6 +94,76 @@ class TestStreamDecoder(unittest.TestCase):
 
         self.decoder._done = True
 
+    def test_process_max_pending_bytes(self):
+        """ Test that the pending data is bounded by max_pending_bytes """
+        blocksize = 1024
+        max_pending_bytes = 4096
+        test_path = self.tests_path / 'data/stereo.flac'
+        with open(test_path, 'rb') as flac:
+            test_data = flac.read()
+
+        self.decoder = StreamDecoder(write_callback=self._write_callback, max_pending_bytes=max_pending_bytes)
+        for i in range(0, len(test_data), blocksize):
+            self.decoder.process(test_data[i:i + blocksize])
+            self.assertLessEqual(len(self.decoder._buffer), max_pending_bytes)
+        self.decoder.finish()
+        self.assertTrue(self.write_callback_called)
+
+    def test_process_batch_frames(self):
+        """ Test that batching frames passes the same audio data in fewer callbacks """
+        test_path = self.tests_path / 'data/stereo.flac'
+        with open(test_path, 'rb') as flac:
+            test_data = flac.read()
+
+        results = {}
+        for batch_frames in (1, 4):
+            blocks = []
+            self.decoder = StreamDecoder(
+                write_callback=lambda data, rate, channels, samples: blocks.append(data),
+                batch_frames=batch_frames
+            )
+            self.decoder.process(test_data)
+            self.decoder.finish()
+            results[batch_frames] = blocks
+
+        self.assertEqual(len(results[4]), -(-len(results[1]) // 4))
+        self.assertTrue(np.array_equal(np.concatenate(results[1]), np.concatenate(results[4])))
+
+    def test_process_queue_frames(self):
+        """ Test that queueing frames for a callback thread passes the same audio data """
+        test_path = self.tests_path / 'data/stereo.flac'
+        with open(test_path, 'rb') as flac:
+            test_data = flac.read()
+
+        results = {}
+        for queue_frames in (0, 2):
+            blocks = []
+            self.decoder = StreamDecoder(
+                write_callback=lambda data, rate, channels, samples: blocks.append(data),
+                queue_frames=queue_frames
+            )
+            self.decoder.process(test_data)
+            self.decoder.finish()
+            results[queue_frames] = blocks
+
+        self.assertTrue(np.array_equal(np.concatenate(results[0]), np.concatenate(results[2])))
+        self.assertFalse(self.decoder._callback_thread.is_alive())
+
+    def test_process_queue_frames_callback_error(self):
+        """ Test that an exception in a queued callback is raised by finish """
+        def write_callback(data, rate, channels, samples):
+            raise RuntimeError
+
+        test_path = self.tests_path / 'data/stereo.flac'
+        with open(test_path, 'rb') as flac:
+            test_data = flac.read()
+
+        with self.assertLogs('pyflac.decoder', level='ERROR'):
+            self.decoder = StreamDecoder(write_callback=write_callback, queue_frames=2)
+            self.decoder.process(test_data)
+            with self.assertRaises(DecoderProcessException):
+                self.decoder.finish()
+
 
 class TestFileDecoder(unittest.TestCase):
     """
@@ -111,12 +182,16 @@ class TestFileDecoder(unittest.TestCase):
             self.decoder = FileDecoder(**self.default_kwargs)
 
     def test_process_8bit_file(self):
-        """ Test that an 8bit file raises an error """
+        """ Test that an 8bit file can be processed """
         test_file = pathlib.Path(__file__).parent / 'data/8bit.flac'
         self.default_kwargs['input_file'] = test_file
-        with self.assertRaises(DecoderProcessException):
-            self.decoder = FileDecoder(**self.default_kwargs)
-            self.decoder.process()
+        self.default_kwargs['output_file'] = pathlib.Path(self.temp_file.name)
+        self.decoder = FileDecoder(**self.default_kwargs)
+        actual, _ = self.decoder.process()
+
+        expected, _ = sf.read(test_file, always_2d=True)
+        self.assertEqual(sf.info(self.temp_file.name).subtype, 'PCM_U8')
+        self.assertTrue(np.array_equal(actual, expected))
 
     def test_process_mono_file(self):
         """ Test that a mono FLAC file can be processed """
@@ -150,6 +225,72 @@ class TestFileDecoder(unittest.TestCase):
         self.decoder = FileDecoder(**self.default_kwargs)
         self.assertIsNotNone(self.decoder.process())
 
+    def test_process_in_memory(self):
+        """ Test that decoding without an output file matches reading back the WAV file """
+        test_file = pathlib.Path(__file__).parent / 'data/stereo.flac'
+        expected_data, expected_rate = FileDecoder(test_file, pathlib.Path(self.temp_file.name)).process()
+
+        self.default_kwargs['input_file'] = test_file
+        self.decoder = FileDecoder(**self.default_kwargs)
+        actual_data, actual_rate = self.decoder.process()
+        self.assertEqual(actual_rate, expected_rate)
+        self.assertTrue(np.array_equal(actual_data, expected_data))
+
+    def test_process_workers(self):
+        """ Test that decoding with several workers matches decoding with one """
+        test_file = pathlib.Path(__file__).parent / 'data/surround.flac'
+        expected_data, expected_rate = FileDecoder(test_file).process()
+
+        self.default_kwargs['input_file'] = test_file
+        self.default_kwargs['workers'] = 3
+        self.decoder = FileDecoder(**self.default_kwargs)
+        actual_data, actual_rate = self.decoder.process()
+        self.assertEqual(actual_rate, expected_rate)
+        self.assertTrue(np.array_equal(actual_data, expected_data))
+
+    def test_process_workers_truncated_file(self):
+        """ Test that a truncated file decodes the same with several workers as with one """
+        data = (pathlib.Path(__file__).parent / 'data/stereo.flac').read_bytes()
+        with tempfile.NamedTemporaryFile(suffix='.flac') as flac_file:
+            flac_file.write(data[:len(data) * 2 // 3])
+            flac_file.flush()
+            with self.assertLogs('pyflac.decoder', level='ERROR'):
+                expected_data, expected_rate = FileDecoder(flac_file.name).process()
+                actual_data, actual_rate = FileDecoder(flac_file.name, workers=3).process()
+
+        self.assertEqual(actual_rate, expected_rate)
+        self.assertTrue(np.array_equal(actual_data, expected_data))
+
+    def test_process_32_bit_file_subtype(self):
+        """ Test that a 32-bit FLAC file is written to a 32-bit WAV file without loss """
+        test_file = pathlib.Path(__file__).parent / 'data/32bit.flac'
+        self.default_kwargs['input_file'] = test_file
+        self.default_kwargs['output_file'] = pathlib.Path(self.temp_file.name)
+        self.decoder = FileDecoder(**self.default_kwargs)
+        self.decoder.process()
+
+        self.assertEqual(sf.info(self.temp_file.name).subtype, 'PCM_32')
+        expected, _ = sf.read(pathlib.Path(__file__).parent / 'data/32bit.wav', dtype='int32')
+        actual, _ = sf.read(self.temp_file.name, dtype='int32')
+        self.assertTrue(np.array_equal(expected, actual))
+
+    def test_process_md5_mismatch(self):
+        """ Test that an MD5 mismatch is only reported when MD5 checking is enabled """
+        data = bytearray((pathlib.Path(__file__).parent / 'data/stereo.flac').read_bytes())
+        data[26] ^= 0xFF  # The first byte of the MD5 signature in the STREAMINFO block
+        with tempfile.NamedTemporaryFile(suffix='.flac') as flac_file:
+            flac_file.write(data)
+            flac_file.flush()
+            self.default_kwargs['input_file'] = pathlib.Path(flac_file.name)
+            self.default_kwargs['output_file'] = pathlib.Path(self.temp_file.name)
+
+            self.decoder = FileDecoder(**self.default_kwargs)
+            self.assertIsNotNone(self.decoder.process())
+
+            self.decoder = FileDecoder(md5_checking=True, **self.default_kwargs)
+            with self.assertRaisesRegex(DecoderProcessException, 'MD5 signature mismatch'):
+                self.decoder.process()
+
 
 class TestOneShotDecoder(unittest.TestCase):
     """
@@ -158,6 +299,7 @@ class TestOneShotDecoder(unittest.TestCase):
     def setUp(self):
         self.decoder = None
         self.write_callback_called = False
+        self.blocks = []
         self.tests_path = pathlib.Path(__file__).parent.absolute()
 
     def _write_callback(self, data, rate, channels, samples):
@@ -166,6 +308,7 @@ class TestOneShotDecoder(unittest.TestCase):
         assert isinstance(channels, int)
         assert isinstance(samples, int)
         self.write_callback_called = True
+        self.blocks.append(data)
 
     def test_process(self):
         """ Test that FLAC data can be decoded """
@@ -176,6 +319,35 @@ class TestOneShotDecoder(unittest.TestCase):
         self.decoder = OneShotDecoder(write_callback=self._write_callback, buffer=test_data)
         self.assertTrue(self.write_callback_called)
 
+        expected, _ = sf.read(self.tests_path / 'data/stereo.wav', dtype='int16')
+        self.assertTrue(np.array_equal(np.concatenate(self.blocks), expected))
+
+    def test_process_8bit_data(self):
+        """ Test that 8-bit FLAC data is decoded to right-aligned int8 samples """
+        test_path = self.tests_path / 'data/8bit.flac'
+        with open(test_path, 'rb') as flac:
+            test_data = flac.read()
+
+        self.decoder = OneShotDecoder(write_callback=self._write_callback, buffer=test_data)
+
+        expected, _ = sf.read(test_path, dtype='int16', always_2d=True)
+        actual = np.concatenate(self.blocks)
+        self.assertEqual(actual.dtype, np.int8)
+        self.assertTrue(np.array_equal(actual, expected >> 8))
+
+    def test_process_24bit_data(self):
+        """ Test that 24-bit FLAC data is decoded to right-aligned int32 samples """
+        expected = np.random.default_rng(0).integers(-2**23, 2**23, size=(10000, 2), dtype=np.int32)
+        with tempfile.NamedTemporaryFile(suffix='.flac') as flac:
+            sf.write(flac.name, expected << 8, 44100, subtype='PCM_24')
+            test_data = flac.read()
+
+        self.decoder = OneShotDecoder(write_callback=self._write_callback, buffer=test_data)
+
+        actual = np.concatenate(self.blocks)
+        self.assertEqual(actual.dtype, np.int32)
+        self.assertTrue(np.array_equal(actual, expected))
+
 
 if __name__ == '__main__':
     unittest.main(failfast=True)
@@ -9,6 +9,7 @@
 #
 # ------------------------------------------------------------------------------
 
+import io
 import pathlib
 import tempfile
 import unittest
@@ -135,6 +136,7 @@ class TestStreamEncoder(unittest.TestCase):
 
     def _metadata_callback(self, metadata):
         self.metadata_callback_called = True
+        self.metadata_total_samples = metadata.data.stream_info.total_samples
 
     def test_invalid_sample_rate(self):
         self.default_kwargs['sample_rate'] = 2000000
@@ -187,6 +189,23 @@ class TestStreamEncoder(unittest.TestCase):
         self.encoder.finish()
         self.assertTrue(self.write_callback_called)
 
+    def test_process_float32(self):
+        """ Test that an array of float32 stereo samples is quantised to 24-bit """
+        encoded = io.BytesIO()
+        self.default_kwargs['write_callback'] = lambda buffer, *args: encoded.write(buffer)
+        self.default_kwargs['seek_callback'] = encoded.seek
+        self.default_kwargs['tell_callback'] = encoded.tell
+        self.encoder = StreamEncoder(**self.default_kwargs)
+        test_samples = np.random.uniform(-1.5, 1.5, (DEFAULT_BLOCKSIZE, 2)).astype('float32')
+        self.encoder.process(test_samples)
+        self.assertEqual(self.encoder._bits_per_sample, 24)
+        self.encoder.finish()
+
+        expected = np.clip(np.rint(test_samples.astype('float64') * 2**23), -2**23, 2**23 - 1)
+        encoded.seek(0)
+        actual, _ = sf.read(encoded, dtype='int32')
+        np.testing.assert_array_equal(actual >> 8, expected)
+
     def test_seek_tell(self):
         """ Test that seek and tell callbacks are used """
         self.default_kwargs['seek_callback'] = self._seek_callback
@@ -215,6 +234,7 @@ class TestStreamEncoder(unittest.TestCase):
         self.encoder.finish()
         self.assertTrue(self.write_callback_called)
         self.assertTrue(self.metadata_callback_called)
+        self.assertEqual(self.metadata_total_samples, DEFAULT_BLOCKSIZE)
 
 class TestFileEncoder(unittest.TestCase):
     """
@@ -288,6 +308,19 @@ class TestFileEncoder(unittest.TestCase):
         self.encoder = FileEncoder(**self.default_kwargs)
         self.encoder.process()
 
+    def test_process_rf64_file(self):
+        """ Test that a WAV file which cannot be memory mapped is read with SoundFile """
+        data, sample_rate = sf.read(self.test_file, dtype='int16')
+        with tempfile.NamedTemporaryFile(suffix='.wav') as rf64_file:
+            sf.write(rf64_file.name, data, sample_rate, format='RF64', subtype='PCM_16')
+            self.default_kwargs['input_file'] = pathlib.Path(rf64_file.name)
+            self.default_kwargs['output_file'] = pathlib.Path(self.temp_file.name)
+            self.encoder = FileEncoder(**self.default_kwargs)
+            self.encoder.process()
+
+        output, _ = sf.read(self.temp_file.name, dtype='int16')
+        np.testing.assert_array_equal(output, data)
+
 
 if __name__ == '__main__':
     unittest.main(failfast=True)
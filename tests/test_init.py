@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+
+# ------------------------------------------------------------------------------
+#
+#  pyFLAC package test suite
+#
+#  Copyright (c) 2020-2024, Sonos, Inc.
+#  All rights reserved.
+#
+# ------------------------------------------------------------------------------
+
+import subprocess
+import sys
+import unittest
+
+
+class TestPackage(unittest.TestCase):
+    """
+    Test suite for the lazily imported package attributes.
+    """
+    def _run(self, code):
+        # --------------------------------------------------------------
+        # Run in a fresh interpreter, so that the submodules have not
+        # already been imported by the other tests.
+        # --------------------------------------------------------------
+        return subprocess.run([sys.executable, '-c', code], capture_output=True, text=True)
+
+    def test_submodule_attributes(self):
+        """ Test that the encoder and decoder submodules are package attributes """
+        result = self._run('import pyflac; print(pyflac.encoder.__name__, pyflac.decoder.__name__)')
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(result.stdout.split(), ['pyflac.encoder', 'pyflac.decoder'])
+
+    def test_class_attributes(self):
+        """ Test that the public classes are package attributes """
+        result = self._run('import pyflac; print(pyflac.StreamDecoder.__module__, pyflac.FileEncoder.__module__)')
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(result.stdout.split(), ['pyflac.decoder', 'pyflac.encoder'])
+
+    def test_unknown_attribute(self):
+        """ Test that an unknown attribute raises an AttributeError """
+        result = self._run('import pyflac; pyflac.invalid')
+        self.assertIn("AttributeError: module 'pyflac' has no attribute 'invalid'", result.stderr)
+
+
+if __name__ == '__main__':
+    unittest.main(failfast=True)